@@ -74,11 +74,39 @@ def normalize_component_3d(pose, component_name: str, plane: Tuple[str, str, str
     line = hand_pose.header.normalization_info(p1=(component_name, line[0]),
                                                p2=(component_name, line[1]))
     normalizer = PoseNormalizer(plane=plane, line=line)
-    normalized_hand = normalizer(hand_pose.body.data)
 
-    # Add normalized hand to pose
-    pose.body.data = ma.concatenate([pose.body.data, normalized_hand], axis=2).astype(np.float32)
-    pose.body.confidence = np.concatenate([pose.body.confidence, hand_pose.body.confidence], axis=2)
+    # keep the kernel on the contiguous fast path; upstream slicing can leave strided views
+    hand_data = hand_pose.body.data
+    if not ma.getdata(hand_data).flags['C_CONTIGUOUS']:
+        hand_data = ma.array(np.ascontiguousarray(ma.getdata(hand_data)), mask=ma.getmask(hand_data))
+    normalized_hand = normalizer(hand_data)
+
+    # Add normalized hand to pose, preallocating the combined buffer instead of
+    # concatenating and then casting, which would peak at twice the pose size
+    data = pose.body.data
+    num_points = data.shape[2]
+    new_data = np.empty((*data.shape[:2], num_points + normalized_hand.shape[2], data.shape[3]), dtype=np.float32)
+    new_data[:, :, :num_points] = ma.getdata(data)
+    new_data[:, :, num_points:] = ma.getdata(normalized_hand)
+
+    # the mask is usually nomask; only materialize a boolean array when something is actually masked
+    data_mask = ma.getmask(data)
+    hand_mask = ma.getmask(normalized_hand)
+    if data_mask is ma.nomask and hand_mask is ma.nomask:
+        pose.body.data = ma.array(new_data)
+    else:
+        new_mask = np.zeros(new_data.shape, dtype=bool)
+        if data_mask is not ma.nomask:
+            new_mask[:, :, :num_points] = data_mask
+        if hand_mask is not ma.nomask:
+            new_mask[:, :, num_points:] = hand_mask
+        pose.body.data = ma.array(new_data, mask=new_mask)
+
+    confidence = pose.body.confidence
+    new_confidence = np.empty((*confidence.shape[:2], new_data.shape[2]), dtype=confidence.dtype)
+    new_confidence[:, :, :num_points] = confidence
+    new_confidence[:, :, num_points:] = hand_pose.body.confidence
+    pose.body.confidence = new_confidence
 
 
 def normalize_hands_3d(pose: Pose):
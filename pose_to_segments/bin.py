@@ -5,6 +5,8 @@ import os
 import pympi
 import torch
 from pose_format import Pose
+from pose_format.pose import distance_batch
+from tqdm import tqdm
 
 from _shared.pose_utils import pose_hide_legs, pose_normalization_info
 from pose_to_segments.src.utils.probs_to_segments import probs_to_segments
@@ -18,43 +20,66 @@ def load_pose(pose_path):
 
     normalization_info = pose_normalization_info(pose.header)
 
-    # Normalize pose
-    pose = pose.normalize(normalization_info)
+    # Normalize pose in place; Pose.normalize would allocate another full copy for the scaling
+    transposed = pose.body.points_perspective()
+    p1s = transposed[normalization_info.p1]
+    p2s = transposed[normalization_info.p2]
+    pose.body.data -= ((p2s + p1s) / 2).mean(axis=(0, 1))
+    pose.body.data *= 1 / distance_batch(p1s, p2s).mean()
+
     pose_hide_legs(pose)
 
     return pose
 
 
-def get_args():
-    parser = argparse.ArgumentParser()
-    parser.add_argument('-i', required=True, type=str, help='path to input pose file')
-    parser.add_argument('-o', required=True, type=str, help='path to output elan file')
-    parser.add_argument('--video', default=None, required=False, type=str, help='path to video file')
+def infer_tensorrt(engine_path, pose_data):
+    # pylint: disable=import-outside-toplevel
+    import tensorrt as trt  # optional dependency, only needed for the engine fast path
 
-    return parser.parse_args()
+    logger = trt.Logger(trt.Logger.WARNING)
+    with open(engine_path, "rb") as f, trt.Runtime(logger) as runtime:
+        engine = runtime.deserialize_cuda_engine(f.read())
+    context = engine.create_execution_context()
+    context.set_input_shape("pose_data", tuple(pose_data.shape))
 
+    # I/O dtypes follow the fp32 ONNX graph, not the --fp16 kernel flag, so bind
+    # buffers of whatever dtype the engine actually declares per tensor
+    dtypes = {trt.DataType.FLOAT: torch.float32, trt.DataType.HALF: torch.float16}
 
-def main():
-    args = get_args()
+    # torch CUDA tensors double as the engine's device buffers
+    pose_data = pose_data.to("cuda", dtypes[engine.get_tensor_dtype("pose_data")]).contiguous()
+    context.set_tensor_address("pose_data", pose_data.data_ptr())
 
-    print('Loading pose ...')
-    pose = load_pose(args.i)
+    outputs = {}
+    for name in ["sign", "sentence"]:
+        output = torch.empty(tuple(context.get_tensor_shape(name)),
+                             dtype=dtypes[engine.get_tensor_dtype(name)],
+                             device="cuda")
+        outputs[name] = output
+        context.set_tensor_address(name, output.data_ptr())
 
-    print('Loading model ...')
-    install_dir = os.path.dirname(os.path.abspath(__file__))
-    model = torch.jit.load(os.path.join(install_dir, "dist", "model.pth"))
+    stream = torch.cuda.Stream()
+    context.execute_async_v3(stream.cuda_stream)
+    stream.synchronize()
+
+    return {name: output.float().cpu() for name, output in outputs.items()}
+
+
+def load_model(install_dir):
+    # prefer the int8 dynamically-quantized model when it has been exported (--save_jit_quantized)
+    model_path = os.path.join(install_dir, "dist", "model_quantized.pth")
+    if not os.path.isfile(model_path):
+        model_path = os.path.join(install_dir, "dist", "model.pth")
+
+    model = torch.jit.load(model_path)
     model.eval()
+    return torch.jit.freeze(model)  # inline parameters and constant-fold the graph
 
-    print('Estimating segments ...')
-    with torch.no_grad():
-        torch_body = pose.body.torch()
-        pose_data = torch_body.data.tensor[:, 0, :, :].unsqueeze(0)
-        probs = model(pose_data)
 
+def save_elan(probs, pose, pose_path, video_path, output_path):
     sign_segments = probs_to_segments(probs["sign"])
     sentence_segments = probs_to_segments(probs["sentence"], .5, .5)
 
-    print('Building ELAN file ...')
     tiers = {
         "SIGN": sign_segments,
         "SENTENCE": sentence_segments,
@@ -63,17 +88,118 @@ def main():
     fps = pose.body.fps
 
     eaf = pympi.Elan.Eaf(author="sign-langauge-processing/transcription")
-    if args.video is not None:
+    if video_path is not None:
         mimetype = None  # pympi is not familiar with mp4 files
-        if args.video.endswith(".mp4"):
+        if video_path.endswith(".mp4"):
             mimetype = "video/mp4"
-        eaf.add_linked_file(args.video, mimetype=mimetype)
-    eaf.add_linked_file(args.i, mimetype="application/pose")
+        eaf.add_linked_file(video_path, mimetype=mimetype)
+    eaf.add_linked_file(pose_path, mimetype="application/pose")
 
     for tier_id, segments in tiers.items():
         eaf.add_tier(tier_id)
         for segment in segments:
             eaf.add_annotation(tier_id, segment["start"] * fps, segment["end"] * fps)
 
-    print('Saving to disk ...')
-    eaf.to_file(args.o)
+    eaf.to_file(output_path)
+
+
+def length_bucket(length: int) -> int:
+    # power-of-two buckets cap the padding overhead of a batch at 2x
+    return 1 << (length - 1).bit_length()
+
+
+def main_directory(args, install_dir, batch_size=8):
+    pose_files = sorted(f for f in os.listdir(args.input_dir) if f.endswith(".pose"))
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    print('Loading poses ...')
+    poses = [(f, load_pose(os.path.join(args.input_dir, f))) for f in tqdm(pose_files)]
+
+    # batch poses of similar length together so each batch pads to its longest pose only
+    poses.sort(key=lambda entry: len(entry[1].body.data))
+    batches = []
+    for entry in poses:
+        bucket = length_bucket(len(entry[1].body.data))
+        if len(batches) == 0 or len(batches[-1]) == batch_size or bucket != batches[-1][-1][-1]:
+            batches.append([])
+        batches[-1].append((*entry, bucket))
+
+    print('Loading model ...')
+    model = load_model(install_dir)
+
+    print('Estimating segments ...')
+    torch.set_num_threads(os.cpu_count())
+    with torch.inference_mode(), torch.jit.optimized_execution(True):
+        for batch in tqdm(batches):
+            pose_datas = [pose.body.torch().data.tensor[:, 0, :, :] for _, pose, _ in batch]
+            max_len = max(len(pose_data) for pose_data in pose_datas)
+            batch_data = torch.zeros(len(batch), max_len, *pose_datas[0].shape[1:])
+            for i, pose_data in enumerate(pose_datas):
+                batch_data[i, :len(pose_data)] = pose_data
+
+            probs = model(batch_data)
+
+            for i, (file_name, pose, _) in enumerate(batch):
+                length = len(pose_datas[i])
+                item_probs = {kind: probs[kind][i, :length] for kind in ["sign", "sentence"]}
+                pose_path = os.path.join(args.input_dir, file_name)
+                output_path = os.path.join(args.output_dir, file_name.removesuffix(".pose") + ".eaf")
+                save_elan(item_probs, pose, pose_path, None, output_path)
+
+
+def get_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-i', required=False, type=str, help='path to input pose file')
+    parser.add_argument('-o', required=False, type=str, help='path to output elan file')
+    parser.add_argument('--video', default=None, required=False, type=str, help='path to video file')
+    parser.add_argument('--input_dir', default=None, required=False, type=str,
+                        help='path to a directory of pose files, transcribed as one batched run')
+    parser.add_argument('--output_dir', default=None, required=False, type=str,
+                        help='path to a directory for the output elan files')
+
+    args = parser.parse_args()
+    if args.input_dir is not None:
+        if args.output_dir is None:
+            parser.error('--output_dir is required with --input_dir')
+    elif args.i is None or args.o is None:
+        parser.error('either -i and -o, or --input_dir and --output_dir, are required')
+
+    return args
+
+
+def main():
+    args = get_args()
+
+    install_dir = os.path.dirname(os.path.abspath(__file__))
+
+    if args.input_dir is not None:
+        main_directory(args, install_dir)
+        return
+
+    print('Loading pose ...')
+    pose = load_pose(args.i)
+
+    torch_body = pose.body.torch()
+    pose_data = torch_body.data.tensor[:, 0, :, :].unsqueeze(0)
+
+    engine_path = os.path.join(install_dir, "dist", "model.trt")
+    if os.path.isfile(engine_path) and torch.cuda.is_available():
+        # FP16 TensorRT engine built from the ONNX export (see pose_to_segments/README.md)
+        print('Estimating segments (TensorRT) ...')
+        probs = infer_tensorrt(engine_path, pose_data)
+    else:
+        print('Loading model ...')
+        model = load_model(install_dir)
+
+        print('Estimating segments ...')
+        torch.set_num_threads(os.cpu_count())
+        # inference_mode also skips version counters and view tracking, unlike no_grad
+        with torch.inference_mode(), torch.jit.optimized_execution(True):
+            # warm up: TorchScript profiles and optimizes the graph on its first calls,
+            # so pay that cost on a small dummy input instead of the real one
+            model(torch.zeros(1, 16, *pose_data.shape[2:]))
+            probs = model(pose_data)
+
+    print('Building ELAN file ...')
+    save_elan(probs, pose, args.i, args.video, args.o)
+    print('Saved to disk.')
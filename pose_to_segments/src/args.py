@@ -22,6 +22,8 @@ parser.add_argument('--lr_scheduler', type=str, default='none', help='optimizer
 parser.add_argument('--dataset', choices=['dgs_corpus'], default='dgs_corpus', help='which dataset to use?')
 parser.add_argument('--data_dir', help='which dir to store the dataset?')
 parser.add_argument('--data_dev', type=bool, default=False, help='whether to use dev set as training data for fast debugging?')
+parser.add_argument('--cache_dir', type=str, default=None, metavar='PATH',
+                    help='which dir to cache processed datums? (recomputed every run if not given)')
 parser.add_argument('--fps', type=int, default=25, help='fps to load')
 parser.add_argument('--pose', choices=['holistic'], default='holistic', help='which pose estimation')
 parser.add_argument(
@@ -42,6 +44,10 @@ parser.add_argument('--encoder_bidirectional', type=bool, default=True, help='sh
 parser.add_argument('--test_only', type=bool, default=False, help='whether to test only instead of training?')
 parser.add_argument('--test', type=bool, default=True, help='whether to test after training finishes?')
 parser.add_argument('--save_jit', type=bool, default=False, help='whether to save model without code?')
+parser.add_argument('--save_jit_quantized', type=bool, default=False,
+                    help='whether to also save an int8 dynamically-quantized jit model for CPU inference?')
+parser.add_argument('--save_onnx', type=bool, default=False,
+                    help='whether to export the model to ONNX (e.g. for building a TensorRT engine)?')
 
 # Prediction args
 parser.add_argument('--checkpoint', type=str, default=None, metavar='PATH', help="Checkpoint path for prediction")
@@ -1,12 +1,11 @@
-from collections import Counter
+import os
 from itertools import chain
 from typing import Any, Dict, Iterable, List, Optional, Tuple, TypedDict
 
 import numpy as np
 import torch
+from numpy import ma
 from pose_format import Pose
-from pose_format.numpy.representation.distance import DistanceRepresentation
-from pose_format.utils.optical_flow import OpticalFlowCalculator
 from sign_language_datasets.datasets.dgs_corpus.dgs_utils import get_elan_sentences
 from torch.utils.data import Dataset
 from tqdm import tqdm
@@ -41,26 +40,52 @@ class PoseSegmentsDatum(TypedDict):
 BIO = {"O": 0, "B": 1, "I": 2}
 
 
-def build_bio(identifier: str, timestamps: torch.Tensor, segments: List[Segment]):
-    bio = torch.zeros(len(timestamps), dtype=torch.long)
+def build_segments(datum: PoseSegmentsDatum) -> SegmentsDict:
+    sign_segments = [segment for sentence_segments in datum["segments"] for segment in sentence_segments]
 
-    timestamp_i = 0
-    for segment in segments:
-        if segment["start_time"] >= timestamps[-1]:
-            print(f"Video {identifier} segment {segment} starts after the end of the pose {timestamps[-1]}")
-            continue
+    sentence_segments = [{
+        "start_time": segments[0]["start_time"],
+        "end_time": segments[-1]["end_time"]
+    } for segments in datum["segments"]]
 
-        while timestamps[timestamp_i] < segment["start_time"]:
-            timestamp_i += 1
-        segment_start_i = timestamp_i
-        while timestamp_i < (len(timestamps) - 1) and timestamps[timestamp_i] < segment["end_time"]:
-            timestamp_i += 1
-        segment_end_i = timestamp_i
+    return {"sign": sign_segments, "sentence": sentence_segments}
 
-        bio[segment_start_i] = BIO["B"]
-        bio[segment_start_i + 1:segment_end_i] = BIO["I"]
 
-    return bio
+def build_bios(identifier: str, timestamps: np.ndarray, segments: SegmentsDict) -> BIODict:
+    all_segments = [segment for kind_segments in segments.values() for segment in kind_segments]
+
+    starts = np.array([segment["start_time"] for segment in all_segments])
+    ends = np.array([segment["end_time"] for segment in all_segments])
+
+    # locate the boundaries of all segment kinds at once instead of scanning timestamps per segment:
+    # B lands on the first frame at or after start_time, I runs up to the first frame at or after
+    # end_time (timestamps are exact float64 frame times, so both sides compare at full precision)
+    start_idx = np.searchsorted(timestamps, starts, side="left")
+    end_idx = np.searchsorted(timestamps, ends, side="left")
+
+    bios = {}
+    offset = 0
+    for kind, kind_segments in segments.items():
+        bio = np.zeros(len(timestamps), dtype=np.int64)
+
+        kind_slice = slice(offset, offset + len(kind_segments))
+        offset += len(kind_segments)
+
+        late = starts[kind_slice] >= timestamps[-1]
+        for segment_i in np.flatnonzero(late):
+            print(f"Video {identifier} segment {kind_segments[segment_i]} "
+                  f"starts after the end of the pose {timestamps[-1]}")
+
+        kind_start_idx = start_idx[kind_slice][~late]
+        kind_end_idx = end_idx[kind_slice][~late]
+
+        for segment_start_i, segment_end_i in zip(kind_start_idx, kind_end_idx):
+            bio[segment_start_i + 1:segment_end_i] = BIO["I"]
+        bio[kind_start_idx] = BIO["B"]
+
+        bios[kind] = torch.from_numpy(bio)
+
+    return bios
 
 
 
@@ -68,35 +93,54 @@ def build_bio(identifier: str, timestamps: torch.Tensor, segments: List[Segment]
 
 class PoseSegmentsDataset(Dataset):
 
-    def __init__(self, data: List[PoseSegmentsDatum], hand_normalization=False, optical_flow=False):
+    def __init__(self, data: List[PoseSegmentsDatum], hand_normalization=False, optical_flow=False,
+                 cache_dir: Optional[str] = None):
         self.data = data
         self.cached_data: List[Any] = [None] * len(data)
 
         self.hand_normalization = hand_normalization
         self.optical_flow = optical_flow
 
+        # timestamps only depend on (fps, length); keep one array per fps and slice it per datum
+        self.timestamps_cache: Dict[float, np.ndarray] = {}
+
+        # persistent cache of processed datums, keyed by preprocessing configuration,
+        # so the expensive first epoch survives process restarts
+        self.cache_dir = None
+        if cache_dir is not None:
+            self.cache_dir = os.path.join(cache_dir,
+                                          f"hand_normalization={hand_normalization}_optical_flow={optical_flow}")
+            os.makedirs(self.cache_dir, exist_ok=True)
+
     def __len__(self):
         return len(self.data)
 
+    def get_timestamps(self, fps: float, length: int) -> np.ndarray:
+        cached = self.timestamps_cache.get(fps)
+        if cached is None or len(cached) < length:
+            # float64 division gives the exact frame time; a float32 grid can round an
+            # annotation boundary onto the wrong frame
+            cached = np.arange(length) / fps
+            self.timestamps_cache[fps] = cached
+        return cached[:length]
+
     def build_classes_vectors(self, datum) -> Tuple[SegmentsDict, BIODict]:
         pose = datum["pose"]
         pose_length = len(pose.body.data)
-        timestamps = torch.div(torch.arange(0, pose_length), pose.body.fps)
-
-        sign_segments = [segment for sentence_segments in datum["segments"] for segment in sentence_segments]
-
-        sentence_segments = [{
-            "start_time": segments[0]["start_time"],
-            "end_time": segments[-1]["end_time"]
-        } for segments in datum["segments"]]
+        timestamps = self.get_timestamps(pose.body.fps, pose_length)
 
-        segments = {"sign": sign_segments, "sentence": sentence_segments}
-        bio = {kind: build_bio(datum["id"], timestamps, s) for kind, s in segments.items()}
+        segments = build_segments(datum)
+        bio = build_bios(datum["id"], timestamps, segments)
         return segments, bio
 
     def add_optical_flow(self, pose):
-        calculator = OpticalFlowCalculator(fps=pose.body.fps, distance=DistanceRepresentation())
-        flow = calculator(pose.body.data)  # numpy: frames - 1, people, points
+        # Euclidean distance between consecutive frames, normalized by fps, as one fused
+        # numpy expression instead of pose_format's per-operation masked arithmetic
+        mask = ma.getmaskarray(pose.body.data)
+        values = np.ascontiguousarray(pose.body.data.data)
+        diff = values[1:] - values[:-1]
+        diff[mask[1:] | mask[:-1]] = 0
+        flow = np.sqrt((diff * diff).sum(axis=-1)) * pose.body.fps  # frames - 1, people, points
         flow = np.expand_dims(flow, axis=-1)  # frames - 1, people, points, 1
         # add one fake frame in numpy
         flow = np.concatenate([np.zeros((1, *flow.shape[1:]), dtype=flow.dtype), flow], axis=0)
@@ -128,20 +172,54 @@ class PoseSegmentsDataset(Dataset):
             }
         }
 
+    def cache_paths(self, identifier: str) -> Tuple[str, str]:
+        prefix = os.path.join(self.cache_dir, identifier)
+        return f"{prefix}.pose.npy", f"{prefix}.npz"
+
+    def load_cached_datum(self, datum: PoseSegmentsDatum):
+        pose_path, npz_path = self.cache_paths(datum["id"])
+        if not (os.path.isfile(pose_path) and os.path.isfile(npz_path)):
+            return None
+
+        # memory-mapped view; frames are only read from disk when accessed
+        pose_data = torch.from_numpy(np.load(pose_path, mmap_mode="c"))
+        with np.load(npz_path) as arrays:
+            bio = {kind: torch.from_numpy(arrays[f"bio_{kind}"]) for kind in ["sign", "sentence"]}
+
+        return {
+            "id": datum["id"],
+            "segments": build_segments(datum),
+            "bio": bio,
+            "mask": torch.ones(len(bio["sign"]), dtype=torch.float),
+            "pose": {
+                "obj": datum["pose"],  # the unprocessed pose; processing only affects "data"
+                "data": pose_data
+            }
+        }
+
+    def cache_datum(self, item):
+        pose_path, npz_path = self.cache_paths(item["id"])
+        np.save(pose_path, item["pose"]["data"].numpy())
+        np.savez(npz_path, bio_sign=item["bio"]["sign"].numpy(), bio_sentence=item["bio"]["sentence"].numpy())
+
     def __getitem__(self, index):
         if self.cached_data[index] is None:
             datum = self.data[index]
-            self.cached_data[index] = self.process_datum(datum)
+            item = self.load_cached_datum(datum) if self.cache_dir is not None else None
+            if item is None:
+                item = self.process_datum(datum)
+                if self.cache_dir is not None:
+                    self.cache_datum(item)
+            self.cached_data[index] = item
 
         return self.cached_data[index]
 
     def inverse_classes_ratio(self, kind: str) -> List[float]:
         print(f"Calculating inverse classes ratio for {kind}...")
-        counter = Counter()
+        counts = torch.zeros(len(BIO), dtype=torch.long)
         for item in tqdm(iter(self), total=len(self), desc="Calculating inverse classes ratio"):
-            counter += Counter(item["bio"][kind].numpy().tolist())
-        sum_counter = sum(counter.values())
-        return [sum_counter / counter[i] for c, i in BIO.items()]
+            counts += torch.bincount(item["bio"][kind], minlength=len(BIO))
+        return (counts.sum() / counts.clamp_min(1)).tolist()
 
 
 def process_datum(datum: ProcessedPoseDatum) -> Iterable[PoseSegmentsDatum]:
@@ -178,30 +256,30 @@ def filter_dataset(tf_datum) -> bool:
 
 
 def dataset_statistics(data):
-    pose_lens = []
-    sentence_nums = []
-    sign_nums = []
+    # preallocated accumulators; entries left at zero are excluded from the means below
+    pose_lens = np.zeros(len(data))
+    sentence_nums = np.zeros(len(data), dtype=np.int64)
+    sign_nums = np.zeros(len(data), dtype=np.int64)
     for i, d in enumerate(data):
         sentence_num = len(d['segments'])
         if sentence_num > 0:
-            sentence_nums.append(sentence_num)
+            sentence_nums[i] = sentence_num
         else:
             print(f'id={d["id"]}: zero segments')
 
-        sign_num = len([item for sublist in d['segments'] for item in sublist])
-        if sign_num > 0:
-            sign_nums.append(sign_num)
+        # count the signs without materializing a flattened list of them
+        sign_nums[i] = np.fromiter((len(sublist) for sublist in d['segments']), np.int64, count=sentence_num).sum()
 
         if sentence_num > 0:
             pose_len = len(d['pose'].body.data) / 25
             if pose_len > d['segments'][0][0]['start_time']:
-                pose_lens.append(pose_len)
+                pose_lens[i] = pose_len
             else:
                 print(f'index={i}: pose does not have enough length')
 
-    print(f'mean pose length: {sum(pose_lens) / len(pose_lens)}')
-    print(f'mean sentence number: {sum(sentence_nums) / len(sentence_nums)}')
-    print(f'mean sign number: {sum(sign_nums) / len(sign_nums)}')
+    print(f'mean pose length: {pose_lens[pose_lens > 0].mean()}')
+    print(f'mean sentence number: {sentence_nums[sentence_nums > 0].mean()}')
+    print(f'mean sign number: {sign_nums[sign_nums > 0].mean()}')
 
 
 def get_dataset(name="dgs_corpus",
@@ -211,7 +289,8 @@ def get_dataset(name="dgs_corpus",
                 components: List[str] = None,
                 data_dir=None,
                 hand_normalization=False,
-                optical_flow=False):
+                optical_flow=False,
+                cache_dir=None):
     data = get_tfds_dataset(name=name, poses=poses, fps=fps, split=split,
                             components=components,
                             data_dir=data_dir,
@@ -221,4 +300,5 @@ def get_dataset(name="dgs_corpus",
     print(f"Dataset({split}) videos: {len(data)}")
     dataset_statistics(data)
     
-    return PoseSegmentsDataset(data, hand_normalization=hand_normalization, optical_flow=optical_flow)
+    return PoseSegmentsDataset(data, hand_normalization=hand_normalization, optical_flow=optical_flow,
+                               cache_dir=cache_dir)
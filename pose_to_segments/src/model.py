@@ -11,7 +11,7 @@ import wandb
 import matplotlib.pyplot as plt
 
 from .utils.probs_to_segments import probs_to_segments
-from .utils.metrics import frame_accuracy, frame_f1, segment_percentage, segment_IoU
+from .utils.metrics import compute_frame_metrics, segment_percentage, segment_IoU
 
 
 class PoseTaggingModel(pl.LightningModule):
@@ -114,9 +114,10 @@ class PoseTaggingModel(pl.LightningModule):
             data['gold'].append(gold)
             data['probs'].append(probs)
 
-            # accuracy and f1
-            metrics['frame_accuracy'].append(frame_accuracy(probs, gold))
-            metrics['frame_f1'].append(frame_f1(probs, gold))
+            # accuracy and f1, sharing one argmax over the probs
+            frame_metrics = compute_frame_metrics(probs, gold)
+            metrics['frame_accuracy'].append(frame_metrics['frame_accuracy'])
+            metrics['frame_f1'].append(frame_metrics['frame_f1'])
 
             # segment IoU and percentage
             segments = probs_to_segments(probs)
@@ -126,7 +127,7 @@ class PoseTaggingModel(pl.LightningModule):
                 'end': math.floor(s['end_time'] * fps),
             } for s in segments_gold]
             metrics['segment_percentage'].append(segment_percentage(segments, segments_gold))
-            metrics['segment_IoU'].append(segment_IoU(segments, segments_gold, max_len=gold.shape[0]))
+            metrics['segment_IoU'].append(segment_IoU(segments, segments_gold))
 
             # advanced plot for testing
             if advanced_plot:
@@ -25,27 +25,36 @@ if __name__ == '__main__':
                      components=args.pose_components,
                      hand_normalization=args.hand_normalization,
                      optical_flow=args.optical_flow,
-                     data_dir=args.data_dir)
+                     data_dir=args.data_dir,
+                     cache_dir=args.cache_dir)
 
-    if not args.test_only:                 
+    # preprocessing runs on the CPU; overlap it with GPU compute via worker processes
+    # (workers share work through --cache_dir, since each forked worker has its own in-memory cache)
+    loader_args = dict(collate_fn=zero_pad_collator,
+                       num_workers=min(8, os.cpu_count()),
+                       persistent_workers=True,
+                       pin_memory=True,
+                       prefetch_factor=4)
+
+    if not args.test_only:
         if args.data_dev:
             train_dataset = get_dataset(split="validation", **data_args)
-            train_loader = DataLoader(train_dataset, batch_size=args.batch_size, shuffle=False, collate_fn=zero_pad_collator)
+            train_loader = DataLoader(train_dataset, batch_size=args.batch_size, shuffle=False, **loader_args)
         else:
             train_dataset = get_dataset(split="train", **data_args)
-            train_loader = DataLoader(train_dataset, batch_size=args.batch_size, shuffle=True, collate_fn=zero_pad_collator)
+            train_loader = DataLoader(train_dataset, batch_size=args.batch_size, shuffle=True, **loader_args)
 
         validation_dataset = get_dataset(split="validation", **data_args)
         validation_loader = DataLoader(validation_dataset,
                                     batch_size=args.batch_size_devtest,
                                     shuffle=False,
-                                    collate_fn=zero_pad_collator)
+                                    **loader_args)
 
     test_dataset = get_dataset(split="test", **data_args)
     test_loader = DataLoader(test_dataset,
                                 batch_size=args.batch_size_devtest,
                                 shuffle=False,
-                                collate_fn=zero_pad_collator)
+                                **loader_args)
 
     _, num_pose_joints, num_pose_dims = test_dataset[0]["pose"]["data"].shape
 
@@ -109,3 +118,29 @@ if __name__ == '__main__':
         traced_cell = torch.jit.trace(model, tuple([pose_data]), strict=False)
         model_path = os.path.join(os.path.dirname(os.path.realpath(__file__)), "../dist", "model.pth")
         torch.jit.save(traced_cell, model_path)
+
+    if args.save_jit_quantized:
+        # int8 dynamic quantization swaps the Linear/LSTM layers for FBGEMM int8 kernels
+        quantized_model = torch.quantization.quantize_dynamic(model, {torch.nn.LSTM, torch.nn.Linear},
+                                                              dtype=torch.qint8)
+        # quantize_dynamic deep-copies the module and the copy loses its trainer;
+        # tracing probes the trainer property and would raise without one attached
+        quantized_model.trainer = model.trainer
+        pose_data = torch.randn((1, 100, num_pose_joints, num_pose_dims))
+        traced_cell = torch.jit.trace(quantized_model, tuple([pose_data]), strict=False)
+        model_path = os.path.join(os.path.dirname(os.path.realpath(__file__)), "../dist", "model_quantized.pth")
+        torch.jit.save(traced_cell, model_path)
+
+    if args.save_onnx:
+        pose_data = torch.randn((1, 100, num_pose_joints, num_pose_dims))
+        model_path = os.path.join(os.path.dirname(os.path.realpath(__file__)), "../dist", "model.onnx")
+        torch.onnx.export(model, (pose_data,), model_path,
+                          input_names=["pose_data"],
+                          output_names=["sign", "sentence"],
+                          dynamic_axes={
+                              "pose_data": {1: "frames"},
+                              "sign": {1: "frames"},
+                              "sentence": {1: "frames"}
+                          },
+                          opset_version=17,
+                          dynamo=False)  # the dynamo exporter requires onnxscript and cannot trace this model
@@ -1,23 +1,32 @@
-from typing import List
+from typing import Dict, List
 
 import torch
-import numpy as np
-from sklearn.metrics import f1_score
 
+NUM_CLASSES = 3
 
-def frame_accuracy(probs: torch.Tensor, gold: torch.Tensor) -> float:
-    """
-    probs: [sequence_length x number_of_classes(3)]
-    gold: [sequence_length]
-    """
-    return float(torch.sum(gold == probs.argmax(dim=1)) / gold.shape[0])
 
-def frame_f1(probs: torch.Tensor, gold: torch.Tensor) -> float:
+def compute_frame_metrics(probs: torch.Tensor, gold: torch.Tensor) -> Dict[str, float]:
     """
     probs: [sequence_length x number_of_classes(3)]
     gold: [sequence_length]
+
+    Computes the argmax once and shares it between frame accuracy and macro F1.
+    F1 comes from an on-device confusion matrix, like
+    sklearn's f1_score(..., average='macro') without the numpy round-trip.
     """
-    return f1_score(gold.numpy(), probs.argmax(dim=1).numpy(), average='macro')
+    preds = probs.argmax(dim=1)
+
+    accuracy = float(torch.sum(gold == preds) / gold.shape[0])
+
+    matrix = torch.bincount(gold * NUM_CLASSES + preds, minlength=NUM_CLASSES * NUM_CLASSES)
+    matrix = matrix.reshape(NUM_CLASSES, NUM_CLASSES)
+    true_positives = matrix.diagonal()
+    denominator = matrix.sum(dim=0) + matrix.sum(dim=1)  # 2 * tp + fp + fn
+    # like sklearn, average only over classes present in gold or predictions
+    present = denominator > 0
+    f1 = 2 * true_positives[present] / denominator[present]
+
+    return {"frame_accuracy": accuracy, "frame_f1": float(f1.mean())}
 
 def segment_percentage(segments: List[dict], segments_gold: List[dict]) -> float:
     """
@@ -25,15 +34,33 @@ def segment_percentage(segments: List[dict], segments_gold: List[dict]) -> float
     """
     return len(segments) / len(segments_gold) if len(segments_gold) > 0 else 0
 
-def segment_IoU(segments: List[dict], segments_gold: List[dict], max_len=1000000) -> float:
-    segments_v = np.zeros(max_len)
-    for segment in segments:
-        segments_v[segment['start']:segment['end']] = 1
+def segment_IoU(segments: List[dict], segments_gold: List[dict]) -> float:
+    """
+    segments: [{'start': 1, 'end': 2}, ...]
 
-    segments_gold_v = np.zeros(max_len)
+    Sweeps over the sorted interval endpoints instead of materializing frame masks,
+    so the cost depends on the number of segments, not the video length.
+    """
+    events = []
+    for segment in segments:
+        events.append((segment['start'], 0, 1))
+        events.append((segment['end'], 0, -1))
     for segment in segments_gold:
-        segments_gold_v[segment['start']:segment['end']] = 1
+        events.append((segment['start'], 1, 1))
+        events.append((segment['end'], 1, -1))
+    events.sort()
+
+    intersection = 0
+    union = 0
+    coverage = [0, 0]
+    last_t = 0
+    for t, which, delta in events:
+        dt = t - last_t
+        if coverage[0] > 0 and coverage[1] > 0:
+            intersection += dt
+        if coverage[0] > 0 or coverage[1] > 0:
+            union += dt
+        coverage[which] += delta
+        last_t = t
 
-    intersection = np.logical_and(segments_v, segments_gold_v)
-    union = np.logical_or(segments_v, segments_gold_v)
-    return float(np.sum(intersection) / np.sum(union)) if np.sum(union) > 0 else 0
\ No newline at end of file
+    return intersection / union if union > 0 else 0
\ No newline at end of file
@@ -5,14 +5,18 @@ BIO = {"O": 0, "B": 1, "I": 2}
 
 def probs_to_segments(probs, b_threshold=50., o_threshold=50.):
     probs = np.round(np.exp(probs.numpy().squeeze()) * 100)
+    # extract both columns as python floats up front; per-element numpy indexing
+    # would allocate a scalar per timestamp inside the loop
+    b_probs = probs[:, BIO["B"]].tolist()
+    o_probs = probs[:, BIO["O"]].tolist()
 
     segments = []
 
     segment = {"start": None, "end": None}
     did_pass_start = False
     for i in range(len(probs)):
-        b = float(probs[i, BIO["B"]])
-        o = float(probs[i, BIO["O"]])
+        b = b_probs[i]
+        o = o_probs[i]
         if segment["start"] is None:
             if b > b_threshold:
                 segment["start"] = i
@@ -1,3 +1,4 @@
+import tempfile
 import unittest
 from typing import List
 
@@ -56,6 +57,23 @@ class DataTestCase(unittest.TestCase):
             rest_bio = bio[1:]
             self.assertTrue(torch.all(torch.eq(torch.full_like(rest_bio, fill_value=2), rest_bio)))
 
+    def test_segment_boundary_on_exact_frame_time(self):
+        # 0.72s at 50 fps is exactly frame 36; a float32 timestamps grid rounds
+        # 36 * (1 / 50) below 0.72 and would shift the B label to frame 37
+        datum = single_datum(num_frames=100, fps=50, segments=[[
+            {
+                "start_time": 0.72,
+                "end_time": 1.0
+            },
+        ]])
+        dataset = PoseSegmentsDataset([datum])
+
+        for bio_type in ["sign", "sentence"]:
+            bio = dataset[0]["bio"][bio_type]
+            self.assertEqual(bio[35], 0)
+            self.assertEqual(bio[36], 1)
+            self.assertEqual(bio[37], 2)
+
     def test_pose_with_optical_flow(self):
         datum = single_datum(num_frames=5, segments=[], dims=3)
         dataset = PoseSegmentsDataset([datum], optical_flow=True)
@@ -76,6 +94,22 @@ class DataTestCase(unittest.TestCase):
         self.assertEqual(pose["data"].shape, (5, 137 + 21 + 21, 3))
         self.assertEqual(pose["data"].dtype, torch.float32)
 
+    def test_disk_cache_round_trip(self):
+        datum = single_datum(num_frames=100, segments=[[
+            {
+                "start_time": 0,
+                "end_time": 4
+            },
+        ]])
+        with tempfile.TemporaryDirectory() as cache_dir:
+            item = PoseSegmentsDataset([datum], cache_dir=cache_dir)[0]
+            cached_item = PoseSegmentsDataset([datum], cache_dir=cache_dir)[0]
+
+            self.assertTrue(torch.equal(item["pose"]["data"], cached_item["pose"]["data"]))
+            for bio_type in ["sign", "sentence"]:
+                self.assertTrue(torch.equal(item["bio"][bio_type], cached_item["bio"][bio_type]))
+            self.assertEqual(item["segments"], cached_item["segments"])
+
     def test_pose_with_hand_normalization_and_optical_flow(self):
         datum = single_datum(num_frames=5, segments=[], dims=3)
         self.assertEqual(datum["pose"].body.data.shape, (5, 1, 137, 3))
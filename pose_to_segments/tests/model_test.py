@@ -54,6 +54,21 @@ class ModelTestCase(unittest.TestCase):
         sum_sentence = torch.exp(log_probs["sentence"]).sum(-1)
         self.assertTrue(torch.allclose(sum_sentence, torch.ones_like(sum_sentence)))
 
+    def test_quantized_model_traces_like_save_jit_quantized(self):
+        model = self.model_setup()
+        model.trainer = MagicMock()
+
+        quantized_model = torch.quantization.quantize_dynamic(model, {torch.nn.LSTM, torch.nn.Linear},
+                                                              dtype=torch.qint8)
+        quantized_model.trainer = model.trainer
+        pose_data = torch.randn((1, self.seq_length, *self.pose_dim))
+        traced_cell = torch.jit.trace(quantized_model, tuple([pose_data]), strict=False)
+
+        log_probs = traced_cell(pose_data)
+        for kind in ["sign", "sentence"]:
+            self.assertEqual(log_probs[kind].shape, (1, self.seq_length, 3))
+            self.assertTrue(torch.all(torch.isfinite(log_probs[kind])))
+
     def test_training_step_expected_loss_finite(self):
         model = self.model_setup()
         batch = self.get_batch()